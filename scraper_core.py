@@ -0,0 +1,737 @@
+"""Scraping logic for the Seismic customer stories app.
+
+Kept out of streamlit_app.py so Streamlit imports it once instead of
+re-executing it on every rerun; the UI script only wires widgets to it.
+"""
+import streamlit as st
+import time
+import threading
+import queue
+from collections import deque
+import pandas as pd
+import xlsxwriter
+import requests
+from requests.adapters import HTTPAdapter
+from selectolax.lexbor import LexborHTMLParser
+import re
+import os
+import json
+import atexit
+import csv
+import io
+import heapq
+import importlib.util
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_for_futures
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.common.exceptions import TimeoutException
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+
+# =========================================================
+# GLOBAL QUEUE (thread-safe, independent of Streamlit)
+# =========================================================
+@st.cache_resource(show_spinner=False)
+def _log_queue():
+    # deque.append and deque.popleft are atomic in CPython, so producers and
+    # the UI drain never need a lock.
+    return deque()
+
+# Cached so the scraper thread and the UI keep sharing one queue even when
+# Streamlit reloads this module after an edit.
+LOG_QUEUE = _log_queue()
+LOG_FLUSH_LINES = 32
+LOG_FLUSH_SECONDS = 0.5
+LOG_MAX_CHUNKS = 1000
+# Queued as (SCRAPER_DONE, status_level, status_message) after a run.
+SCRAPER_DONE = "__SCRAPER_DONE__"
+
+# Each thread batches its lines and hands them to LOG_QUEUE in one append
+# instead of one per message.
+_log_buffer = threading.local()
+
+def log(msg: str):
+    """Write a message to the console and this thread's log buffer."""
+    timestamp = time.strftime("[%H:%M:%S]")
+    text = f"{timestamp} {msg}"
+    print(text)
+    lines = getattr(_log_buffer, "lines", None)
+    if lines is None:
+        lines = _log_buffer.lines = []
+        _log_buffer.flushed_at = time.monotonic()
+    lines.append(text)
+    if len(lines) >= LOG_FLUSH_LINES or time.monotonic() - _log_buffer.flushed_at >= LOG_FLUSH_SECONDS:
+        flush_log()
+
+def flush_log():
+    """Push this thread's buffered lines to the queue as a single entry."""
+    lines = getattr(_log_buffer, "lines", None)
+    if lines:
+        LOG_QUEUE.append("\n".join(lines))
+        lines.clear()
+    _log_buffer.flushed_at = time.monotonic()
+
+# =========================================================
+# Scraper logic
+# =========================================================
+BASE_URL = "https://www.seismic.com/customer-stories/"
+# "csv" skips workbook serialization entirely and is much faster to write;
+# "parquet" is the smallest file but needs pyarrow installed.
+OUTPUT_FORMAT = "xlsx"
+OUTPUT_FILENAME = f"seismic_customer_stories_STREAMLIT.{OUTPUT_FORMAT}"
+OUTPUT_MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+OUTPUT_COLUMNS = ["url", "company_name", "title", "description"]
+# The partial CSV and the story cache also record when each row was scraped
+# (Unix seconds), so cached rows can expire one by one.
+ROW_COLUMNS = OUTPUT_COLUMNS + ["scraped_at"]
+SKIPPED_FILENAME = "skipped.csv"
+# Rows are streamed here during a run. A failed run leaves it behind and the
+# next run resumes from it instead of scraping those URLs again.
+PARTIAL_FILENAME = f"{OUTPUT_FILENAME}.partial.csv"
+# Every row of the last completed run. Stories already in it are copied from
+# here instead of being fetched again; set to False to force a full re-scrape.
+USE_STORY_CACHE = True
+STORY_CACHE_FILENAME = "story_cache.csv"
+# Cached rows scraped longer ago than this are fetched again, so edited
+# stories get picked up.
+STORY_CACHE_MAX_AGE = 7 * 24 * 3600
+CSV_FLUSH_ROWS = 50
+MAX_RETRIES = 3
+RETRY_MAX_DELAY = 30
+PARALLEL_WORKERS = 4
+# (connect, read): an unreachable host fails fast, a slow page still gets time.
+HTTP_TIMEOUT = (5, 30)
+WAIT_TIMEOUT = 20
+# WebDriverWait polls every 0.5s by default; most conditions here resolve
+# well inside that, so check more often.
+WAIT_POLL_SECONDS = 0.1
+# e.g. "https://chrome.browserless.io/webdriver?token=..." or a Grid hub URL.
+REMOTE_WEBDRIVER_URL = os.environ.get("REMOTE_WEBDRIVER_URL")
+# Set to False when story pages are known to render without JavaScript;
+# details are then fetched over HTTP only and no browser is launched for them.
+USE_BROWSER_FALLBACK = True
+CHROMEDRIVER_CACHE_FILE = os.path.expanduser("~/.cache/wox_airframe/chromedriver_path.json")
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+# Subresources the scraper never reads; blocked in the browser via CDP.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm", "*.mov",
+    # Nothing waits on layout: clicks go through JS and the waits check DOM
+    # presence, so stylesheets can go too.
+    "*.css",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*",
+    "*hotjar*", "*segment.io*", "*cdn.segment.com*", "*munchkin.marketo*",
+    "*bat.bing.com*", "*connect.facebook.net*", "*snap.licdn.com*",
+]
+STORY_LIST_CSS = "ul[class*='grid-cols-1']"
+STORY_CARD_LINK_CSS = f"{STORY_LIST_CSS} a[href]"
+COOKIE_BUTTON_ID = "onetrust-accept-btn-handler"
+TITLE_CSS = "h1"
+DESCRIPTION_CSS = 'div[class*="lg:col-span-7"]'
+COMPANY_SLUG_RE = re.compile(r"/customer-stories/([^/]+)/?")
+# Slugs whose display name str.title() gets wrong (acronyms, punctuation),
+# e.g. "ibm": "IBM". Deliberately empty: add an entry only after checking the
+# name the story page itself uses.
+COMPANY_NAME_OVERRIDES = {}
+# a.href is resolved by the browser, so story links are always absolute and
+# begin with BASE_URL; a story ("<slug>/") has a slash after that prefix,
+# the listing and its "?page=" variants do not.
+STORY_URL_PREFIX_LEN = len(BASE_URL)
+# Narrows the card links in the browser, so nav and CTA links inside the grid
+# are never sent back; the Python filter still checks the full URL shape.
+STORY_HREF_CSS = 'a[href*="/customer-stories/"]'
+# Every card href in the first story grid, in one round-trip instead of
+# serializing page_source and parsing it in Python.
+CARD_HREFS_JS = """
+const ul = document.querySelector(arguments[0]);
+return ul ? Array.from(ul.querySelectorAll(arguments[1]), a => a.href) : null;
+"""
+# Clicks the page button and resolves with the new page's card hrefs once the
+# grid re-renders, or null if the button is missing or nothing changes in
+# time; replaces the clickable wait, the click and the polled href check.
+PAGINATE_JS = """
+const [listCss, linkCss, page, timeoutMs, done] = arguments;
+const hrefs = () => {
+    const ul = document.querySelector(listCss);
+    return ul ? Array.from(ul.querySelectorAll(linkCss), a => a.href) : null;
+};
+const btn = document.querySelector(`a[data-page="${page}"]`);
+if (!btn) {
+    done(null);
+    return;
+}
+const before = (hrefs() || [])[0];
+const observer = new MutationObserver(() => {
+    const now = hrefs();
+    if (now && now.length && now[0] !== before) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(now);
+    }
+});
+const timer = setTimeout(() => {
+    observer.disconnect();
+    done(null);
+}, timeoutMs);
+observer.observe(document.body, {childList: true, subtree: true});
+btn.click();
+"""
+COOKIE_ACCEPT_JS = """
+const button = document.getElementById(arguments[0]);
+if (button) button.click();
+return !!button;
+"""
+STORY_READY_JS = "return document.readyState !== 'loading' && !!document.querySelector(arguments[0]);"
+# Same fields as parse_story_details, read from the live DOM in one call.
+EXTRACT_STORY_JS = """
+const h1 = document.querySelector(arguments[0]);
+const desc = document.querySelector(arguments[1]);
+return {
+    title: h1 ? h1.textContent.trim() : null,
+    description: desc
+        ? Array.from(desc.querySelectorAll("p"), p => p.textContent.trim()).join(" ")
+        : null,
+};
+"""
+SECTION_KEYWORDS = frozenset({"challenge", "solution", "headquarters", "industry", "integrations", "share", "results"})
+
+def navigate(driver, wait, url):
+    """Load url in a pooled driver without the previous page leaking through.
+
+    With page_load_strategy "none", driver.get returns before the new
+    document commits, so a reused browser still shows its last page and any
+    readiness check would pass against it. Parking on about:blank first
+    means every element a caller waits for must come from url.
+    """
+    driver.get("about:blank")
+    wait.until(lambda d: d.execute_script("return location.href;") == "about:blank")
+    driver.get(url)
+
+def get_story_links(driver, wait):
+    log(f"Navigating to {BASE_URL} to find links...")
+    navigate(driver, wait, BASE_URL)
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, STORY_CARD_LINK_CSS)))
+    links = set()
+    # Every href already looked at, kept or not, so repeats skip the filter.
+    seen_hrefs = set()
+    # Pagination clicks go through JS, so the banner never blocks them; accept
+    # it if it is already there rather than waiting for it to appear.
+    if driver.execute_script(COOKIE_ACCEPT_JS, COOKIE_BUTTON_ID):
+        log("  Accepted cookie banner.")
+    else:
+        log("  No cookie banner found, continuing...")
+
+    for page_num in range(1, 7):
+        log(f"  Scraping page {page_num}...")
+        try:
+            if page_num > 1:
+                hrefs = driver.execute_async_script(
+                    PAGINATE_JS, STORY_LIST_CSS, STORY_HREF_CSS, page_num, WAIT_TIMEOUT * 1000
+                )
+                if hrefs is None:
+                    log(f"    Skipped page {page_num}.")
+                    continue
+            else:
+                hrefs = driver.execute_script(CARD_HREFS_JS, STORY_LIST_CSS, STORY_HREF_CSS)
+                if hrefs is None:
+                    continue
+            found = 0
+            for href in hrefs:
+                if href in seen_hrefs:
+                    continue
+                seen_hrefs.add(href)
+                if href.startswith(BASE_URL) and href.find("/", STORY_URL_PREFIX_LEN) != -1:
+                    links.add(href)
+                    found += 1
+            log(f"    Found {found} links on this page.")
+        except Exception:
+            log(f"    Skipped page {page_num}.")
+    log(f"\nFound {len(links)} total unique story links.")
+    return list(links)
+
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """Keep-alive session for story pages, shared by every worker and run.
+
+    urllib3's pool is thread-safe; pool_maxsize lets each worker hold its own
+    connection to the host. Retries are left to scrape_all_stories.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PARALLEL_WORKERS, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+def warm_http_session(session):
+    """Open the session's connections to the site in the background.
+
+    One HEAD per worker runs while the browser collects links, so the first
+    story fetches find DNS, TCP and TLS already done.
+    """
+    def head():
+        try:
+            session.head(BASE_URL, timeout=HTTP_TIMEOUT)
+        except requests.RequestException:
+            pass
+    for _ in range(PARALLEL_WORKERS):
+        threading.Thread(target=head, daemon=True).start()
+
+def fast_fetch(url, session):
+    resp = session.get(url, timeout=HTTP_TIMEOUT)
+    resp.raise_for_status()
+    return resp.text
+
+def company_name_from_url(url):
+    """Display name from the story slug, or None if the URL has no slug."""
+    match = COMPANY_SLUG_RE.search(url)
+    if not match:
+        return None
+    slug = match.group(1)
+    return COMPANY_NAME_OVERRIDES.get(slug) or slug.replace("-", " ").title()
+
+def parse_story_details(html):
+    # Lexbor parses and runs the CSS queries in C, without building a Python
+    # object per node the way BeautifulSoup does.
+    tree = LexborHTMLParser(html)
+    h1 = tree.css_first(TITLE_CSS)
+    desc_div = tree.css_first(DESCRIPTION_CSS)
+    return {
+        "title": h1.text(strip=True) if h1 else None,
+        "description": " ".join(p.text(strip=True) for p in desc_div.css("p")) if desc_div else None,
+    }
+
+def scrape_story_details(url, session, driver_pool):
+    log(f"  Scraping: {url}")
+    # Pure string work, so a malformed URL is caught before any fetch.
+    company_name = company_name_from_url(url)
+    if company_name is None:
+        log("    No company slug in URL, skipping fetch.")
+        return {"url": url, "company_name": None, "title": None, "description": None}
+    if not USE_BROWSER_FALLBACK:
+        return {"url": url, "company_name": company_name, **parse_story_details(fast_fetch(url, session))}
+    try:
+        fields = parse_story_details(fast_fetch(url, session))
+        if fields["title"]:
+            return {"url": url, "company_name": company_name, **fields}
+        log("    No title in static HTML, using browser.")
+    except requests.RequestException as e:
+        log(f"    HTTP fetch failed ({e}), using browser.")
+    driver, wait = driver_pool.acquire()
+    broken = False
+    try:
+        navigate(driver, wait, url)
+        try:
+            wait.until(lambda d: d.execute_script(STORY_READY_JS, TITLE_CSS))
+        except TimeoutException:
+            # Some third-party script is still holding the page; whatever
+            # has rendered may already be enough.
+            log("    Timed out waiting for the title, reading the partial page.")
+        # Everything needed is in the DOM; abort whatever is still loading.
+        driver.execute_script("window.stop();")
+        # The browser already holds the parsed DOM, so read the fields there
+        # rather than shipping page_source back to parse again.
+        fields = driver.execute_script(EXTRACT_STORY_JS, TITLE_CSS, DESCRIPTION_CSS)
+    except TimeoutException:
+        # The browser answered, it just never got off the last page in time;
+        # it stays in the pool and the URL is retried.
+        raise
+    except Exception:
+        # Anything else is likely a dead session: a WebDriverException, or
+        # urllib3's MaxRetryError/ProtocolError once chromedriver itself is
+        # gone. Start a fresh browser for the retry rather than probing
+        # every driver before each URL.
+        broken = True
+        raise
+    finally:
+        if broken:
+            driver_pool.discard((driver, wait))
+        else:
+            driver_pool.release((driver, wait))
+    if not fields["title"]:
+        raise TimeoutException(f"No title rendered on {url}")
+    return {"url": url, "company_name": company_name, **fields}
+
+# st.cache_resource rather than lru_cache so the path also survives Streamlit
+# reloading this module.
+@st.cache_resource(show_spinner=False)
+def _chromedriver_path():
+    """Resolve the chromedriver binary once per app process.
+
+    The path is also kept in CHROMEDRIVER_CACHE_FILE, keyed by the installed
+    Chrome version, so a fresh process skips webdriver_manager's network
+    lookup until Chrome is upgraded.
+    """
+    try:
+        chrome_version = OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception:
+        chrome_version = None
+    if chrome_version:
+        try:
+            with open(CHROMEDRIVER_CACHE_FILE, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("chrome_version") == chrome_version and os.path.exists(cached.get("path", "")):
+                return cached["path"]
+        except (OSError, ValueError):
+            pass
+    path = ChromeDriverManager().install()
+    if chrome_version:
+        try:
+            os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE_FILE), exist_ok=True)
+            with open(CHROMEDRIVER_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump({"chrome_version": chrome_version, "path": path}, f)
+        except OSError:
+            pass
+    return path
+
+def make_driver():
+    """Launch a headless Chrome and return (driver, wait)."""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    # driver.get() returns as soon as navigation starts; every caller waits
+    # explicitly for the element it needs instead of for the load event.
+    options.page_load_strategy = "none"
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+        "profile.managed_default_content_settings.plugins": 2,
+    })
+    if REMOTE_WEBDRIVER_URL:
+        # A shared Selenium Grid / Browserless endpoint keeps browsers warm
+        # across app instances; CDP is not exposed over plain Remote.
+        driver = webdriver.Remote(command_executor=REMOTE_WEBDRIVER_URL, options=options)
+        log("Connected to remote WebDriver.")
+        return driver, WebDriverWait(driver, WAIT_TIMEOUT, poll_frequency=WAIT_POLL_SECONDS)
+    # An explicit CHROMEDRIVER_PATH wins over the system Chromium detection.
+    env_driver_path = os.environ.get("CHROMEDRIVER_PATH")
+    if env_driver_path:
+        service = ChromeService(env_driver_path)
+        driver = webdriver.Chrome(service=service, options=options)
+        log("Using chromedriver from CHROMEDRIVER_PATH.")
+    elif os.path.exists("/usr/bin/chromium") and os.path.exists("/usr/bin/chromedriver"):
+        options.binary_location = "/usr/bin/chromium"
+        service = ChromeService("/usr/bin/chromedriver")
+        driver = webdriver.Chrome(service=service, options=options)
+        log("Detected system Chromium.")
+    else:
+        service = ChromeService(_chromedriver_path())
+        driver = webdriver.Chrome(service=service, options=options)
+        log("Using webdriver_manager Chrome.")
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    # Scripts that do load are shared by every story page; keep them cached
+    # for the life of the pooled browser.
+    driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "deny"})
+    return driver, WebDriverWait(driver, WAIT_TIMEOUT, poll_frequency=WAIT_POLL_SECONDS)
+
+class DriverPool:
+    """Browsers shared across scrape runs, launched only when first needed.
+
+    A caller checks a driver out for one job and hands it back afterwards,
+    so no two threads ever drive the same browser at once.
+    """
+
+    def __init__(self):
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        pair = make_driver()
+        with self._lock:
+            self._all.append(pair)
+        return pair
+
+    def release(self, pair):
+        self._idle.put(pair)
+
+    def discard(self, pair):
+        """Quit a driver that failed instead of handing it back."""
+        with self._lock:
+            if pair in self._all:
+                self._all.remove(pair)
+        try:
+            pair[0].quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            pairs, self._all = self._all, []
+        self._idle = queue.Queue()
+        for driver, _ in pairs:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        return len(pairs)
+
+@st.cache_resource(show_spinner=False)
+def get_driver_pool():
+    """The app-wide DriverPool; its browsers are quit when the app exits."""
+    pool = DriverPool()
+    atexit.register(pool.close)
+    return pool
+
+def _scrape_on_worker(url, session, driver_pool):
+    try:
+        return scrape_story_details(url, session, driver_pool)
+    finally:
+        flush_log()
+
+def scrape_all_stories(urls, session, driver_pool, out, write_header=True):
+    """Scrape story pages concurrently on PARALLEL_WORKERS threads.
+
+    Each row is written to the CSV file ``out`` as soon as it is scraped, so
+    memory stays flat and a crash keeps everything scraped so far; returns
+    the number of rows written. Pass write_header=False when appending to
+    an existing file. A failed URL is resubmitted after its own
+    exponential backoff while the other URLs keep going; after MAX_RETRIES
+    attempts it is written to SKIPPED_FILENAME.
+    """
+    # A skip list left by an earlier run would read as this run's.
+    if os.path.exists(SKIPPED_FILENAME):
+        os.remove(SKIPPED_FILENAME)
+    rows = csv.DictWriter(out, fieldnames=ROW_COLUMNS, extrasaction="ignore")
+    if write_header:
+        rows.writeheader()
+    written = 0
+    attempts = {}
+    skipped = []
+    retry_at = []  # heap of (monotonic time, url)
+    with ThreadPoolExecutor(max_workers=PARALLEL_WORKERS) as executor:
+        futures = {executor.submit(_scrape_on_worker, url, session, driver_pool): url for url in urls}
+        while futures or retry_at:
+            now = time.monotonic()
+            while retry_at and retry_at[0][0] <= now:
+                _, url = heapq.heappop(retry_at)
+                futures[executor.submit(_scrape_on_worker, url, session, driver_pool)] = url
+            timeout = retry_at[0][0] - now if retry_at else None
+            if not futures:
+                time.sleep(max(timeout, 0))
+                continue
+            done, _ = wait_for_futures(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = futures.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    attempts[url] = attempts.get(url, 0) + 1
+                    if attempts[url] >= MAX_RETRIES:
+                        log(f"  Giving up on {url} after {MAX_RETRIES} attempts: {e}")
+                        skipped.append((url, str(e)))
+                    else:
+                        delay = min(2 ** attempts[url], RETRY_MAX_DELAY)
+                        log(f"  Attempt {attempts[url]}/{MAX_RETRIES} failed for {url}: {e} (retrying in {delay}s)")
+                        heapq.heappush(retry_at, (time.monotonic() + delay, url))
+                    # The coordinator thread logs nothing else until the next
+                    # failure, so hand the line over now.
+                    flush_log()
+                    continue
+                rows.writerow({**data, "scraped_at": int(time.time())})
+                written += 1
+                if written % CSV_FLUSH_ROWS == 0:
+                    out.flush()
+    if skipped:
+        pd.DataFrame(skipped, columns=["url", "error"]).to_csv(SKIPPED_FILENAME, index=False)
+        log(f"Skipped {len(skipped)} URLs, listed in {SKIPPED_FILENAME}.")
+    return written
+
+def already_scraped(csv_path):
+    """Return the URLs already saved in the partial CSV at csv_path.
+
+    A hard kill can leave the file ending mid-row; that row is cut off so the
+    next append starts on a clean line and its URL is scraped again. A file
+    from an older column layout, or older than STORY_CACHE_MAX_AGE, is
+    discarded instead of resumed.
+    """
+    if not os.path.exists(csv_path):
+        return set()
+    if time.time() - os.path.getmtime(csv_path) > STORY_CACHE_MAX_AGE:
+        log(f"{csv_path} is out of date, starting over.")
+        os.remove(csv_path)
+        return set()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        content = f.read()
+    records = list(csv.reader(io.StringIO(content, newline="")))
+    if not records or records[0] != ROW_COLUMNS:
+        # Header never made it to disk, or the file predates ROW_COLUMNS.
+        os.remove(csv_path)
+        return set()
+    rows = records[1:]
+    # Rows end in "\r\n" and the last column is an unquoted integer, so an
+    # interrupted row either lacks the terminator or comes up a field short.
+    if rows and (not content.endswith("\r\n") or len(rows[-1]) != len(ROW_COLUMNS)):
+        log(f"Dropping an incomplete last row from {csv_path}.")
+        rows.pop()
+        tmp_path = f"{csv_path}.tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(ROW_COLUMNS)
+            writer.writerows(rows)
+        os.replace(tmp_path, csv_path)
+    return {row[0] for row in rows}
+
+def load_story_cache():
+    """Return the unexpired rows of STORY_CACHE_FILENAME keyed by URL.
+
+    Each row keeps the scraped_at of its original fetch, even after being
+    reused, so a story is fetched again STORY_CACHE_MAX_AGE after it was
+    last actually scraped.
+    """
+    if not USE_STORY_CACHE or not os.path.exists(STORY_CACHE_FILENAME):
+        return {}
+    cutoff = time.time() - STORY_CACHE_MAX_AGE
+    cache = {}
+    expired = 0
+    with open(STORY_CACHE_FILENAME, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                fresh = float(row.get("scraped_at") or 0) >= cutoff
+            except ValueError:
+                fresh = False
+            if fresh and row.get("title"):
+                cache[row["url"]] = row
+            else:
+                expired += 1
+    if expired:
+        log(f"{expired} cached stories are out of date and will be scraped again.")
+    return cache
+
+def save_story_cache(csv_path):
+    """Replace STORY_CACHE_FILENAME with the rows of csv_path that have a title.
+
+    Rows without one came from a failed or HTTP-only scrape and are left out,
+    so the next run tries them again instead of reusing the gap.
+    """
+    tmp_path = f"{STORY_CACHE_FILENAME}.tmp"
+    with open(csv_path, newline="", encoding="utf-8") as f, \
+            open(tmp_path, "w", newline="", encoding="utf-8") as out:
+        rows = csv.DictWriter(out, fieldnames=ROW_COLUMNS, extrasaction="ignore")
+        rows.writeheader()
+        rows.writerows(row for row in csv.DictReader(f) if row.get("title"))
+    os.replace(tmp_path, STORY_CACHE_FILENAME)
+
+def _output_records(csv_path):
+    """Yield the rows of the partial CSV at csv_path as OUTPUT_COLUMNS lists."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        records = csv.reader(f)
+        header = next(records, ROW_COLUMNS)
+        indexes = [header.index(column) for column in OUTPUT_COLUMNS]
+        for record in records:
+            yield [record[i] if i < len(record) else "" for i in indexes]
+
+def write_output(csv_path):
+    """Turn the streamed CSV at csv_path into OUTPUT_FILENAME.
+
+    The scraped_at bookkeeping column is left out of the output.
+    """
+    if OUTPUT_FORMAT == "csv":
+        tmp_path = f"{OUTPUT_FILENAME}.tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(OUTPUT_COLUMNS)
+            writer.writerows(_output_records(csv_path))
+        os.replace(tmp_path, OUTPUT_FILENAME)
+        return
+    if OUTPUT_FORMAT == "parquet":
+        df = pd.read_csv(csv_path, usecols=OUTPUT_COLUMNS, dtype=str,
+                         keep_default_na=False, na_values=[""])[OUTPUT_COLUMNS]
+        df.to_parquet(OUTPUT_FILENAME, engine="pyarrow", compression="zstd", index=False)
+        return
+    # constant_memory flushes each row to disk once the next one starts, so
+    # cells must arrive in row order: write_row per CSV record, never
+    # DataFrame.to_excel, which writes column by column and would lose all
+    # but the last row of every column after the first. strings_to_urls=False
+    # keeps the url column as plain text rather than a hyperlink per row.
+    with xlsxwriter.Workbook(OUTPUT_FILENAME, {"constant_memory": True,
+                                               "strings_to_urls": False}) as workbook:
+        sheet = workbook.add_worksheet("Stories")
+        header = workbook.add_format({"bold": True})
+        sheet.write_row(0, 0, OUTPUT_COLUMNS, header)
+        for row_num, record in enumerate(_output_records(csv_path), start=1):
+            # Empty strings are skipped by xlsxwriter, leaving blank cells.
+            sheet.write_row(row_num, 0, record)
+
+def run_scraper():
+    """Background thread: logs go to LOG_QUEUE, not Streamlit."""
+    log("🚀 Scraper starting...")
+    driver_pool = get_driver_pool()
+    status = ("info", "No data scraped.")
+    finished = False
+    try:
+        # Fail before scraping, not after it in write_output.
+        if OUTPUT_FORMAT == "parquet" and importlib.util.find_spec("pyarrow") is None:
+            raise RuntimeError('OUTPUT_FORMAT "parquet" needs pyarrow: pip install pyarrow')
+        session = get_http_session()
+        warm_http_session(session)
+        driver, wait = driver_pool.acquire()
+        try:
+            urls = get_story_links(driver, wait)
+        finally:
+            driver_pool.release((driver, wait))
+        # The listing summary must reach the UI before any worker's lines.
+        flush_log()
+        done_urls = already_scraped(PARTIAL_FILENAME)
+        if done_urls:
+            urls = [url for url in urls if url not in done_urls]
+            log(f"Resuming: {len(done_urls)} stories already saved in {PARTIAL_FILENAME}, {len(urls)} left.")
+        cache = load_story_cache()
+        cached_rows = [cache[url] for url in urls if url in cache]
+        if cached_rows:
+            urls = [url for url in urls if url not in cache]
+            log(f"Reusing {len(cached_rows)} stories from {STORY_CACHE_FILENAME}, {len(urls)} to scrape.")
+        flush_log()
+        write_header = not os.path.exists(PARTIAL_FILENAME)
+        with open(PARTIAL_FILENAME, "a", newline="", encoding="utf-8") as out:
+            if cached_rows:
+                # Reused rows keep their original scraped_at.
+                rows = csv.DictWriter(out, fieldnames=ROW_COLUMNS, extrasaction="ignore")
+                if write_header:
+                    rows.writeheader()
+                    write_header = False
+                rows.writerows(cached_rows)
+            written = scrape_all_stories(urls, session, driver_pool, out,
+                                         write_header=write_header)
+
+        if written or done_urls or cached_rows:
+            if USE_STORY_CACHE:
+                save_story_cache(PARTIAL_FILENAME)
+            write_output(PARTIAL_FILENAME)
+            log(f"✅ Saved to {OUTPUT_FILENAME}")
+            status = ("ok", "✅ Scraping complete! File saved successfully.")
+        else:
+            log("No data scraped.")
+        finished = True
+    except Exception as e:
+        log(f"❌ Fatal error: {e}")
+        status = ("err", f"❌ Scraping failed: {e}")
+        if os.path.exists(PARTIAL_FILENAME):
+            log(f"Rows scraped so far are kept in {PARTIAL_FILENAME}; the next run resumes from it.")
+        # Don't hand possibly broken browsers to the next run.
+        if driver_pool.close():
+            log("Browser closed.")
+    finally:
+        if finished and os.path.exists(PARTIAL_FILENAME):
+            os.remove(PARTIAL_FILENAME)
+        flush_log()
+        LOG_QUEUE.append((SCRAPER_DONE, *status))